@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 """BlackRoad Dotfiles Manager – symlink, backup, diff, and restore dotfiles."""
 
-import argparse, hashlib, json, os, shutil, sqlite3, sys
+import argparse, asyncio, base64, difflib, hashlib, itertools, json, os, shutil, sqlite3, stat, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import partial
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
@@ -16,6 +18,9 @@ def warn(m): print(f"{YELLOW}⚠{NC} {m}")
 
 DB_PATH    = os.path.expanduser("~/.blackroad-personal/dotfiles.db")
 CATEGORIES = ("shell", "editor", "git", "tmux", "tool")
+_CATEGORY_SET = frozenset(CATEGORIES)
+DIFF_MAX_LINES = 400
+MAX_FS_WORKERS = 32   # filesystem work is syscall-bound, so threads overlap the latency
 
 @dataclass
 class DotfileEntry:
@@ -32,14 +37,35 @@ class Snapshot:
     id: int
     entry_id: int
     content_hash: str
-    saved_at: str
+    saved_at: int   # epoch microseconds
     notes: str
 
+SNAPSHOTS_DDL = """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        id           INTEGER PRIMARY KEY AUTOINCREMENT,
+        entry_id     INTEGER NOT NULL REFERENCES dotfiles(id),
+        content_hash TEXT NOT NULL,
+        saved_at     INTEGER NOT NULL,
+        notes        TEXT NOT NULL DEFAULT ''
+    )"""
+SNAPSHOTS_INDEX = "CREATE INDEX IF NOT EXISTS idx_snap_entry_saved ON snapshots(entry_id, saved_at DESC)"
+
+# sqlite3 connections are bound to the thread that opened them, so cache per thread
+_DB_LOCAL = threading.local()
+
 def get_db() -> sqlite3.Connection:
+    cache: dict[str, sqlite3.Connection] = _DB_LOCAL.__dict__.setdefault("conns", {})
+    conn = cache.get(DB_PATH)
+    if conn is not None:
+        return conn
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, cached_statements=256)
     conn.row_factory = sqlite3.Row
-    conn.executescript("""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.executescript(f"""
         CREATE TABLE IF NOT EXISTS dotfiles (
             id          INTEGER PRIMARY KEY AUTOINCREMENT,
             name        TEXT NOT NULL UNIQUE,
@@ -49,35 +75,85 @@ def get_db() -> sqlite3.Connection:
             description TEXT NOT NULL DEFAULT '',
             auto_update INTEGER NOT NULL DEFAULT 0
         );
-        CREATE TABLE IF NOT EXISTS snapshots (
-            id           INTEGER PRIMARY KEY AUTOINCREMENT,
-            entry_id     INTEGER NOT NULL REFERENCES dotfiles(id),
-            content_hash TEXT NOT NULL,
-            content_b64  TEXT NOT NULL DEFAULT '',
-            saved_at     TEXT NOT NULL,
-            notes        TEXT NOT NULL DEFAULT ''
+        {SNAPSHOTS_DDL};
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash    TEXT PRIMARY KEY,
+            content BLOB NOT NULL
         );
+        {SNAPSHOTS_INDEX};
+        CREATE INDEX IF NOT EXISTS idx_dot_category_name ON dotfiles(category, name);
     """)
+    conn.execute("BEGIN")   # legacy migrations below apply atomically
+    cols = {r["name"]: r["type"] for r in conn.execute("PRAGMA table_info(snapshots)")}
+    if "content" in cols:
+        conn.execute("INSERT OR IGNORE INTO blobs(hash,content) "
+                     "SELECT content_hash, content FROM snapshots")
+        conn.execute("ALTER TABLE snapshots DROP COLUMN content")
+    if "content_b64" in cols:
+        # Oldest schema kept snapshot content base64-encoded on each row
+        legacy = conn.execute("SELECT content_hash, content_b64 FROM snapshots").fetchall()
+        conn.executemany("INSERT OR IGNORE INTO blobs(hash,content) VALUES(?,?)",
+                         [(r["content_hash"], base64.b64decode(r["content_b64"])) for r in legacy])
+        conn.execute("ALTER TABLE snapshots DROP COLUMN content_b64")
+    if cols["saved_at"] != "INTEGER":
+        # saved_at used to be a local-time ISO string; rebuild with INTEGER affinity
+        conn.execute("ALTER TABLE snapshots RENAME TO snapshots_legacy")
+        conn.execute("DROP INDEX idx_snap_entry_saved")
+        conn.execute(SNAPSHOTS_DDL)
+        conn.execute(SNAPSHOTS_INDEX)
+        legacy = conn.execute("SELECT id, entry_id, content_hash, saved_at, notes FROM snapshots_legacy").fetchall()
+        conn.executemany("INSERT INTO snapshots(id,entry_id,content_hash,saved_at,notes) VALUES(?,?,?,?,?)",
+                         [(r["id"], r["entry_id"], r["content_hash"],
+                           int(datetime.fromisoformat(r["saved_at"]).timestamp() * 1_000_000), r["notes"])
+                          for r in legacy])
+        conn.execute("DROP TABLE snapshots_legacy")
     conn.commit()
+    cache[DB_PATH] = conn
     return conn
 
 def file_hash(path: str) -> str:
     try:
-        with open(path, "rb") as f:
-            return hashlib.sha256(f.read()).hexdigest()
+        with open(path, "rb", buffering=0) as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
     except Exception:
         return ""
 
+def _lstat(path) -> Optional[os.stat_result]:
+    try:
+        return os.lstat(path)
+    except OSError:
+        return None
+
+def _fs_map(fn, items: list) -> list:
+    """Apply a syscall-bound fn to items on a thread pool, preserving order."""
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_FS_WORKERS, len(items)))) as ex:
+        return list(ex.map(fn, items))
+
+def _is_linked_to(target: str, source: str) -> bool:
+    # One readlink answers both "is it a symlink" and "does it point at source"
+    try:
+        return os.readlink(target) == source
+    except OSError:
+        return False
+
+def fmt_ts(us: int) -> str:
+    return datetime.fromtimestamp(us / 1e6).isoformat(timespec="seconds")
+
+def read_and_hash(path: str) -> tuple[bytes, str]:
+    h, buf = hashlib.sha256(), bytearray()
+    with open(path, "rb") as f:
+        while (b := f.read(1 << 16)):
+            h.update(b); buf += b
+    return bytes(buf), h.hexdigest()
+
 def row_to_entry(row) -> DotfileEntry:
-    d = dict(row)
-    return DotfileEntry(id=d["id"], name=d["name"], source_path=d["source_path"],
-                        target_path=d["target_path"], category=d["category"],
-                        description=d["description"], auto_update=bool(d["auto_update"]))
+    return DotfileEntry(id=row["id"], name=row["name"], source_path=row["source_path"],
+                        target_path=row["target_path"], category=row["category"],
+                        description=row["description"], auto_update=bool(row["auto_update"]))
 
 def row_to_snapshot(row) -> Snapshot:
-    d = dict(row)
-    return Snapshot(id=d["id"], entry_id=d["entry_id"], content_hash=d["content_hash"],
-                    saved_at=d["saved_at"], notes=d["notes"])
+    return Snapshot(id=row["id"], entry_id=row["entry_id"], content_hash=row["content_hash"],
+                    saved_at=row["saved_at"], notes=row["notes"])
 
 CATEGORY_ICON = {"shell":"🐚","editor":"✏️","git":"🌿","tmux":"🖥️","tool":"🔧"}
 
@@ -91,10 +167,13 @@ def print_entry(e: DotfileEntry, status=""):
 
 # ── Commands ──────────────────────────────────────────────────────────────────
 def cmd_register(args):
-    if args.category not in CATEGORIES:
+    if args.category not in _CATEGORY_SET:
         err(f"Category must be one of: {', '.join(CATEGORIES)}"); sys.exit(1)
     db = get_db()
-    source = str(Path(args.source).expanduser().resolve())
+    # Always absolute: a relative symlink source would resolve against the target's directory
+    source = os.path.abspath(os.path.expanduser(args.source))
+    if args.resolve:
+        source = os.path.realpath(source)
     target = str(Path(args.target).expanduser())
     try:
         db.execute("""
@@ -104,6 +183,7 @@ def cmd_register(args):
         db.commit()
         ok(f"Registered: {args.name}  ({source} → {target})")
     except sqlite3.IntegrityError:
+        db.rollback()   # the connection is shared, don't leave the transaction open
         err(f"A dotfile named '{args.name}' is already registered")
 
 def cmd_link(args):
@@ -120,9 +200,9 @@ def cmd_link(args):
 
     target.parent.mkdir(parents=True, exist_ok=True)
 
-    if target.exists() or target.is_symlink():
-        if target.is_symlink() and os.readlink(str(target)) == str(source):
-            ok(f"Already linked: {target}"); return
+    if _is_linked_to(e.target_path, e.source_path):
+        ok(f"Already linked: {target}"); return
+    if os.path.lexists(e.target_path):
         backup = str(target) + ".bak"
         shutil.move(str(target), backup)
         warn(f"Existing file backed up to {backup}")
@@ -137,23 +217,42 @@ def cmd_sync_all(args):
         warn("No dotfiles with auto_update enabled")
         info("Use --auto flag when registering"); return
     info(f"Syncing {len(rows)} dotfile(s)…")
-    for row in rows:
-        e = row_to_entry(row)
-        _do_link(e)
-
-def _do_link(e: DotfileEntry):
-    target = Path(e.target_path)
-    source = Path(e.source_path)
-    if not source.exists():
-        warn(f"  {e.name}: source missing ({source})"); return
-    target.parent.mkdir(parents=True, exist_ok=True)
-    if target.exists() or target.is_symlink():
-        if target.is_symlink() and os.readlink(str(target)) == str(source):
-            ok(f"  {e.name}: already linked"); return
-        backup = str(target) + ".bak"
-        shutil.move(str(target), backup)
-    os.symlink(str(source), str(target))
-    ok(f"  {e.name}: linked")
+    entries = [row_to_entry(r) for r in rows]
+    # Entries sharing a target must not race on it, so each target's entries run in turn
+    by_target: dict[str, list[int]] = {}
+    for i, e in enumerate(entries):
+        by_target.setdefault(e.target_path, []).append(i)
+    link    = partial(_do_link, parents_done=set())
+    results = [None] * len(entries)
+    def link_group(idxs):
+        for i in idxs:
+            results[i] = link(entries[i])
+    _fs_map(link_group, list(by_target.values()))
+    for show, msg in results:
+        show(msg)
+
+def _do_link(e: DotfileEntry, parents_done: Optional[set] = None):
+    """Link one entry; returns (printer, message) so callers can report in order.
+
+    parents_done collects directories already created during a batch so that
+    entries sharing a parent only pay for one mkdir.
+    """
+    source, target = e.source_path, e.target_path
+    if not os.path.exists(source):
+        return warn, f"  {e.name}: source missing ({source})"
+    try:
+        parent = os.path.dirname(target) or "."
+        if parents_done is None or parent not in parents_done:
+            os.makedirs(parent, exist_ok=True)
+            if parents_done is not None: parents_done.add(parent)
+        if _is_linked_to(target, source):
+            return ok, f"  {e.name}: already linked"
+        if os.path.lexists(target):
+            shutil.move(target, target + ".bak")
+        os.symlink(source, target)
+    except OSError as exc:
+        return err, f"  {e.name}: {exc}"
+    return ok, f"  {e.name}: linked"
 
 def cmd_backup(args):
     db  = get_db()
@@ -164,15 +263,74 @@ def cmd_backup(args):
     path = Path(e.source_path)
     if not path.exists():
         err(f"Source file not found: {path}"); return
-    content = path.read_bytes()
-    h       = hashlib.sha256(content).hexdigest()
-    b64     = __import__("base64").b64encode(content).decode()
-    now     = datetime.now().isoformat()
-    db.execute("INSERT INTO snapshots(entry_id,content_hash,content_b64,saved_at,notes) VALUES(?,?,?,?,?)",
-               (args.entry_id, h, b64, now, args.notes or ""))
+    last = db.execute(
+        "SELECT content_hash FROM snapshots WHERE entry_id=? ORDER BY saved_at DESC LIMIT 1", (args.entry_id,)
+    ).fetchone()
+    if last and last["content_hash"] == file_hash(e.source_path):
+        ok(f"{e.name}: unchanged, no snapshot written"); return
+    content, h = read_and_hash(e.source_path)
+    now        = int(time.time() * 1_000_000)
+    db.execute("INSERT OR IGNORE INTO blobs(hash,content) VALUES(?,?)", (h, sqlite3.Binary(content)))
+    db.execute("INSERT INTO snapshots(entry_id,content_hash,saved_at,notes) VALUES(?,?,?,?)",
+               (args.entry_id, h, now, args.notes or ""))
     db.commit()
     ok(f"Snapshot saved for {e.name}  hash={h[:12]}…")
 
+def _backup_probe(path: str, last_hash: Optional[str]) -> Optional[tuple[Optional[bytes], str]]:
+    """Hash first and only read the content when it differs from last_hash.
+
+    Returns None if the source is unreadable, (None, hash) if unchanged.
+    """
+    h = file_hash(path)
+    if not h:
+        return None
+    if h == last_hash:
+        return None, h
+    try:
+        return read_and_hash(path)
+    except OSError:
+        return None
+
+async def _backup_probe_all(entries: List[DotfileEntry], last: dict) -> list:
+    # Reads are latency-bound, so overlap them on worker threads
+    return await asyncio.gather(*(asyncio.to_thread(_backup_probe, e.source_path, last.get(e.id))
+                                  for e in entries))
+
+def cmd_backup_all(args):
+    db      = get_db()
+    entries = [row_to_entry(r) for r in db.execute("SELECT * FROM dotfiles ORDER BY category, name")]
+    if not entries:
+        warn("No dotfiles registered"); return
+    # SQLite takes bare columns from the row that supplied MAX()
+    last = {r["entry_id"]: r["content_hash"] for r in db.execute(
+        "SELECT entry_id, content_hash, MAX(saved_at) FROM snapshots GROUP BY entry_id")}
+    results = asyncio.run(_backup_probe_all(entries, last))
+    now = int(time.time() * 1_000_000)
+    blobs, snaps = [], []
+    for e, res in zip(entries, results):
+        if res is None:
+            warn(f"  {e.name}: source missing ({e.source_path})"); continue
+        content, h = res
+        if content is None:
+            info(f"  {e.name}: unchanged"); continue
+        blobs.append((h, sqlite3.Binary(content)))
+        snaps.append((e.id, h, now, args.notes or ""))
+        ok(f"  {e.name}: hash={h[:12]}…")
+    if snaps:
+        with db:
+            db.executemany("INSERT OR IGNORE INTO blobs(hash,content) VALUES(?,?)", blobs)
+            db.executemany("INSERT INTO snapshots(entry_id,content_hash,saved_at,notes) VALUES(?,?,?,?)", snaps)
+    ok(f"Saved {len(snaps)} snapshot(s)")
+
+def _mark_missing_newlines(lines):
+    # Mirror diff -u so a change to only the final newline is still visible
+    for line in lines:
+        if line.endswith("\n"):
+            yield line
+        else:
+            yield line + "\n"
+            yield "\\ No newline at end of file\n"
+
 def cmd_diff(args):
     db  = get_db()
     row = db.execute("SELECT * FROM dotfiles WHERE id=?", (args.entry_id,)).fetchone()
@@ -180,7 +338,8 @@ def cmd_diff(args):
         err(f"Entry #{args.entry_id} not found"); return
     e = row_to_entry(row)
     snap = db.execute(
-        "SELECT * FROM snapshots WHERE entry_id=? ORDER BY saved_at DESC LIMIT 1", (args.entry_id,)
+        "SELECT s.*, b.content FROM snapshots s JOIN blobs b ON s.content_hash=b.hash "
+        "WHERE s.entry_id=? ORDER BY s.saved_at DESC LIMIT 1", (args.entry_id,)
     ).fetchone()
     if not snap:
         warn(f"No snapshots for {e.name}. Run `backup` first."); return
@@ -188,17 +347,12 @@ def cmd_diff(args):
     if current_hash == snap["content_hash"]:
         ok(f"{e.name}: no changes since last snapshot")
     else:
-        warn(f"{e.name}: file has changed since snapshot {snap['saved_at'][:19]}")
-        # Attempt unified diff
-        import tempfile, subprocess
-        with tempfile.NamedTemporaryFile(suffix=".old", delete=False, mode="wb") as f:
-            f.write(__import__("base64").b64decode(snap["content_b64"]))
-            old_file = f.name
-        result = subprocess.run(["diff", "-u", old_file, e.source_path],
-                                capture_output=True, text=True)
-        os.unlink(old_file)
-        if result.stdout:
-            print(result.stdout[:2000])
+        warn(f"{e.name}: file has changed since snapshot {fmt_ts(snap['saved_at'])}")
+        old = snap["content"].decode(errors="replace").splitlines(keepends=True)
+        new = (Path(e.source_path).read_bytes().decode(errors="replace").splitlines(keepends=True)
+               if current_hash else [])
+        diff = difflib.unified_diff(old, new, fromfile="snapshot", tofile="current")
+        sys.stdout.writelines(itertools.islice(_mark_missing_newlines(diff), DIFF_MAX_LINES))
 
 def cmd_restore(args):
     db  = get_db()
@@ -206,17 +360,20 @@ def cmd_restore(args):
     if not row:
         err(f"Entry #{args.entry_id} not found"); return
     e    = row_to_entry(row)
-    snap = db.execute("SELECT * FROM snapshots WHERE id=?", (args.snapshot_id,)).fetchone()
+    snap = db.execute(
+        "SELECT s.*, b.content FROM snapshots s JOIN blobs b ON s.content_hash=b.hash WHERE s.id=?",
+        (args.snapshot_id,)
+    ).fetchone()
     if not snap:
         err(f"Snapshot #{args.snapshot_id} not found"); return
-    content = __import__("base64").b64decode(snap["content_b64"])
+    content = snap["content"]
     path    = Path(e.source_path)
     # Back up current
     if path.exists():
         shutil.copy2(str(path), str(path) + ".pre-restore")
         warn(f"Current version backed up to {path}.pre-restore")
     path.write_bytes(content)
-    ok(f"Restored {e.name} from snapshot #{snap['id']} ({snap['saved_at'][:19]})")
+    ok(f"Restored {e.name} from snapshot #{snap['id']} ({fmt_ts(snap['saved_at'])})")
 
 def cmd_export_manifest(args):
     db   = get_db()
@@ -226,61 +383,95 @@ def cmd_export_manifest(args):
     with open(fname, "w") as f: json.dump(data, f, indent=2)
     ok(f"Manifest exported to {fname}  ({len(data)} entries)")
 
+IMPORT_CHUNK = 50   # rows per multi-VALUES INSERT; 50 × 6 params stays under SQLite's 999 limit
+_INSERT_DOTFILES = ("INSERT OR IGNORE INTO dotfiles"
+                    "(name,source_path,target_path,category,description,auto_update) VALUES")
+
+def register_many(entries: List[DotfileEntry]) -> int:
+    """Register entries in one transaction; returns how many were new (ids are ignored).
+
+    Raises ValueError, writing nothing, if any entry has a category outside CATEGORIES.
+    """
+    bad = [e.name for e in entries if e.category not in _CATEGORY_SET]
+    if bad:
+        raise ValueError(f"Invalid category for {', '.join(bad)}; must be one of: {', '.join(CATEGORIES)}")
+    db = get_db()
+    with db:
+        cur = db.executemany(_INSERT_DOTFILES + "(?,?,?,?,?,?)", [
+            (e.name, e.source_path, e.target_path, e.category, e.description, int(e.auto_update))
+            for e in entries])
+    return cur.rowcount
+
 def cmd_import_manifest(args):
     with open(args.file) as f: data = json.load(f)
+    # Items missing a required key are skipped and show up in the N/M count
+    rows = [(item["name"], item["source_path"], item["target_path"],
+             item.get("category","tool"), item.get("description",""), item.get("auto_update",0))
+            for item in data
+            if isinstance(item, dict) and all(k in item for k in ("name", "source_path", "target_path"))]
+    full = len(rows) - len(rows) % IMPORT_CHUNK
+    many = _INSERT_DOTFILES + ",".join(["(?,?,?,?,?,?)"] * IMPORT_CHUNK)
     db = get_db()
     imported = 0
-    for item in data:
-        try:
-            db.execute("""
-                INSERT OR IGNORE INTO dotfiles(name,source_path,target_path,category,description,auto_update)
-                VALUES(?,?,?,?,?,?)
-            """, (item["name"], item["source_path"], item["target_path"],
-                  item.get("category","tool"), item.get("description",""), item.get("auto_update",0)))
-            imported += 1
-        except Exception: pass
-    db.commit()
+    try:
+        with db:
+            for i in range(0, full, IMPORT_CHUNK):
+                imported += db.execute(many, [x for r in rows[i:i + IMPORT_CHUNK] for x in r]).rowcount
+            if full < len(rows):
+                imported += db.executemany(_INSERT_DOTFILES + "(?,?,?,?,?,?)", rows[full:]).rowcount
+    except sqlite3.Error as exc:
+        err(f"Import failed, nothing imported: {exc}"); sys.exit(1)
     ok(f"Imported {imported}/{len(data)} entries")
 
+def _check_entry(e: DotfileEntry) -> str:
+    st = _lstat(e.target_path)
+    if st is None:
+        return "missing"
+    if not stat.S_ISLNK(st.st_mode):
+        return "unlinked"
+    try:
+        os.stat(e.target_path)
+        return "ok"
+    except OSError:
+        return "broken"
+
 def cmd_check_broken(args):
-    db   = get_db()
-    rows = db.execute("SELECT * FROM dotfiles").fetchall()
+    db      = get_db()
+    entries = [row_to_entry(r) for r in db.execute("SELECT * FROM dotfiles").fetchall()]
+    statuses = _fs_map(_check_entry, entries)
     broken = 0
-    for row in rows:
-        e = row_to_entry(row)
-        t = Path(e.target_path)
-        if t.is_symlink():
-            if not t.exists():
-                err(f"  BROKEN  {e.name}: {t} → (missing)")
-                broken += 1
-            else:
-                ok(f"  OK      {e.name}")
-        elif t.exists():
-            warn(f"  UNLINKED  {e.name}: {t} exists but is not a symlink")
+    for e, status in zip(entries, statuses):
+        if status == "broken":
+            err(f"  BROKEN  {e.name}: {e.target_path} → (missing)")
+            broken += 1
+        elif status == "ok":
+            ok(f"  OK      {e.name}")
+        elif status == "unlinked":
+            warn(f"  UNLINKED  {e.name}: {e.target_path} exists but is not a symlink")
         else:
             info(f"  NOT LINKED  {e.name}")
     if broken == 0:
         ok("No broken symlinks")
 
+LIST_STATUS = {
+    "ok":       f"{GREEN}linked{NC}",
+    "unlinked": f"{YELLOW}exists (unlinked){NC}",
+    "broken":   f"{RED}not linked{NC}",
+    "missing":  f"{RED}not linked{NC}",
+}
+
 def cmd_list(args):
     db   = get_db()
     rows = db.execute("SELECT * FROM dotfiles ORDER BY category, name").fetchall()
     if not rows:
         warn("No dotfiles registered"); return
+    entries = [row_to_entry(r) for r in rows]
     cur_cat = None
-    for row in rows:
-        e = row_to_entry(row)
+    for e, status in zip(entries, _fs_map(_check_entry, entries)):
         if e.category != cur_cat:
             cur_cat = e.category
             print(f"\n{BOLD}{CATEGORY_ICON.get(e.category,'?')} {e.category.upper()}{NC}")
-        t = Path(e.target_path)
-        if t.is_symlink() and t.exists():
-            status = f"{GREEN}linked{NC}"
-        elif t.exists():
-            status = f"{YELLOW}exists (unlinked){NC}"
-        else:
-            status = f"{RED}not linked{NC}"
-        print_entry(e, status)
+        print_entry(e, LIST_STATUS[status])
 
 def cmd_snapshots(args):
     db   = get_db()
@@ -292,7 +483,7 @@ def cmd_snapshots(args):
         warn(f"No snapshots for entry #{args.entry_id}"); return
     print(f"\n{BOLD}Snapshots for entry #{args.entry_id}:{NC}")
     for r in rows:
-        print(f"  [{r['id']:>3}] {r['saved_at'][:19]}  hash={r['content_hash'][:12]}…  {r['notes']}")
+        print(f"  [{r['id']:>3}] {fmt_ts(r['saved_at'])}  hash={r['content_hash'][:12]}…  {r['notes']}")
 
 def main():
     parser = argparse.ArgumentParser(prog="br-dots", description="BlackRoad Dotfiles Manager")
@@ -300,7 +491,10 @@ def main():
 
     p = sub.add_parser("register"); p.add_argument("name"); p.add_argument("source"); p.add_argument("target")
     p.add_argument("--category",default="tool",choices=CATEGORIES); p.add_argument("--description",default="")
-    p.add_argument("--auto",action="store_true"); p.set_defaults(func=cmd_register)
+    p.add_argument("--auto",action="store_true")
+    p.add_argument("--no-resolve",dest="resolve",action="store_false",
+                   help="store the source path as given instead of resolving symlinks")
+    p.set_defaults(func=cmd_register)
 
     p = sub.add_parser("link");   p.add_argument("entry_id",type=int); p.set_defaults(func=cmd_link)
     sub.add_parser("sync-all").set_defaults(func=cmd_sync_all)
@@ -308,6 +502,9 @@ def main():
     p = sub.add_parser("backup"); p.add_argument("entry_id",type=int); p.add_argument("--notes",default="")
     p.set_defaults(func=cmd_backup)
 
+    p = sub.add_parser("backup-all"); p.add_argument("--notes",default="")
+    p.set_defaults(func=cmd_backup_all)
+
     p = sub.add_parser("diff"); p.add_argument("entry_id",type=int); p.set_defaults(func=cmd_diff)
 
     p = sub.add_parser("restore"); p.add_argument("entry_id",type=int); p.add_argument("snapshot_id",type=int)
@@ -1,5 +1,5 @@
 """Tests for dotfiles_manager.py"""
-import base64, hashlib, json, os, sys
+import base64, hashlib, json, os, sqlite3, sys
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 import pytest
@@ -140,3 +140,357 @@ def test_categories():
     assert "git"    in dm.CATEGORIES
     assert "tmux"   in dm.CATEGORIES
     assert "tool"   in dm.CATEGORIES
+
+
+def test_import_manifest_skips_existing(tmp_db, tmp_path, capsys):
+    _register(tmp_db, "zshrc")
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([
+        {"name": "zshrc", "source_path": "/a", "target_path": "/b"},
+        {"name": "vimrc", "source_path": "/c", "target_path": "/d", "category": "editor"},
+    ]))
+    dm.cmd_import_manifest(MagicMock(file=str(manifest)))
+    assert "Imported 1/2 entries" in capsys.readouterr().out
+    row = dm.get_db().execute("SELECT * FROM dotfiles WHERE name='vimrc'").fetchone()
+    assert row["category"] == "editor"
+
+
+def test_db_uses_wal(tmp_db):
+    db = dm.get_db()
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute("PRAGMA synchronous").fetchone()[0] == 1   # NORMAL
+
+
+def test_db_connection_cached_per_path(tmp_db, monkeypatch):
+    db = dm.get_db()
+    assert dm.get_db() is db
+    monkeypatch.setattr(dm, "DB_PATH", str(tmp_db / "other.db"))
+    assert dm.get_db() is not db
+
+
+def test_legacy_b64_snapshots_migrated(tmp_db):
+    conn = sqlite3.connect(dm.DB_PATH)
+    conn.executescript("""
+        CREATE TABLE snapshots (
+            id           INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id     INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            content_b64  TEXT NOT NULL DEFAULT '',
+            saved_at     TEXT NOT NULL,
+            notes        TEXT NOT NULL DEFAULT ''
+        );
+    """)
+    conn.execute("INSERT INTO snapshots(entry_id,content_hash,content_b64,saved_at) "
+                 "VALUES(1,'h',?,'2024-05-01T12:30:00.123456')",
+                 (base64.b64encode(b"# old\n").decode(),))
+    empty_hash = hashlib.sha256(b"").hexdigest()
+    conn.execute("INSERT INTO snapshots(entry_id,content_hash,content_b64,saved_at) "
+                 "VALUES(2,?,'','2024-05-01T12:31:00')", (empty_hash,))
+    conn.commit(); conn.close()
+    db = dm.get_db()
+    assert db.execute("SELECT content FROM blobs WHERE hash=?", (empty_hash,)).fetchone()[0] == b""
+    snap = db.execute("SELECT * FROM snapshots WHERE entry_id=1").fetchone()
+    assert "content_b64" not in snap.keys()
+    assert dm.fmt_ts(snap["saved_at"]) == "2024-05-01T12:30:00"
+    assert db.execute("SELECT typeof(saved_at) FROM snapshots").fetchone()[0] == "integer"
+    assert db.execute("SELECT content FROM blobs WHERE hash='h'").fetchone()[0] == b"# old\n"
+
+
+def test_backup_dedupes_blobs(tmp_db):
+    eid, src, dst = _register(tmp_db)
+    original = src.read_text()
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    src.write_text("# changed")
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    src.write_text(original)
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    db = dm.get_db()
+    assert db.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0] == 3
+    assert db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 2
+
+
+def test_read_and_hash(tmp_db):
+    f = tmp_db / "big.bin"
+    data = os.urandom(200_000)
+    f.write_bytes(data)
+    content, h = dm.read_and_hash(str(f))
+    assert content == data
+    assert h == hashlib.sha256(data).hexdigest() == dm.file_hash(str(f))
+
+
+def test_sync_all_links_in_order(tmp_db, capsys):
+    links = [_register(tmp_db, name, auto=True) for name in ("alpha", "beta", "gamma")]
+    dm.cmd_sync_all(MagicMock())
+    for _, src, dst in links:
+        assert os.readlink(str(dst)) == str(src)
+    out = capsys.readouterr().out
+    assert out.index("alpha") < out.index("beta") < out.index("gamma")
+
+
+def test_check_broken(tmp_db, capsys):
+    eid, src, dst = _register(tmp_db, "zshrc")
+    dm.cmd_link(MagicMock(entry_id=eid))
+    _register(tmp_db, "vimrc")
+    src.unlink()
+    dm.cmd_check_broken(MagicMock())
+    out = capsys.readouterr()
+    assert "BROKEN  zshrc" in out.err
+    assert "NOT LINKED  vimrc" in out.out
+
+
+def test_link_backs_up_existing_file(tmp_db):
+    eid, src, dst = _register(tmp_db, "gitconfig")
+    dst.write_text("[user]\n")
+    dm.cmd_link(MagicMock(entry_id=eid))
+    assert os.readlink(str(dst)) == str(src)
+    assert Path(str(dst) + ".bak").read_text() == "[user]\n"
+
+
+def test_queries_use_indexes(tmp_db):
+    db = dm.get_db()
+    def plan(sql, *params):
+        return " ".join(r["detail"] for r in db.execute("EXPLAIN QUERY PLAN " + sql, params))
+    snap = plan("SELECT * FROM snapshots WHERE entry_id=? ORDER BY saved_at DESC LIMIT 1", 1)
+    assert "idx_snap_entry_saved" in snap and "TEMP B-TREE" not in snap
+    dots = plan("SELECT * FROM dotfiles ORDER BY category, name")
+    assert "idx_dot_category_name" in dots and "TEMP B-TREE" not in dots
+
+
+def test_import_manifest_chunked(tmp_db, tmp_path, capsys):
+    n = dm.IMPORT_CHUNK * 2 + 7
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([
+        {"name": f"dot{i}", "source_path": f"/s/{i}", "target_path": f"/t/{i}"} for i in range(n)
+    ] + [{"name": "dot0", "source_path": "/dup", "target_path": "/dup"}]))
+    dm.cmd_import_manifest(MagicMock(file=str(manifest)))
+    assert f"Imported {n}/{n + 1} entries" in capsys.readouterr().out
+    db = dm.get_db()
+    assert db.execute("SELECT COUNT(*) FROM dotfiles").fetchone()[0] == n
+    assert db.execute("SELECT source_path FROM dotfiles WHERE name='dot0'").fetchone()[0] == "/s/0"
+
+
+def test_list_reports_link_status(tmp_db, capsys):
+    eid, _, _ = _register(tmp_db, "zshrc", category="shell")
+    _register(tmp_db, "vimrc", category="editor")
+    dm.cmd_link(MagicMock(entry_id=eid))
+    capsys.readouterr()
+    dm.cmd_list(MagicMock())
+    out = capsys.readouterr().out
+    assert out.index("EDITOR") < out.index("vimrc") < out.index("not linked") < out.index("SHELL")
+    assert "linked" in out[out.index("zshrc"):]
+
+
+def test_backup_unchanged_skips_snapshot(tmp_db, capsys):
+    eid, src, dst = _register(tmp_db)
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    assert "unchanged, no snapshot written" in capsys.readouterr().out
+    assert dm.get_db().execute("SELECT COUNT(*) FROM snapshots").fetchone()[0] == 1
+
+
+def test_diff_shows_unified_diff(tmp_db, capsys):
+    eid, src, dst = _register(tmp_db)
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    src.write_text(src.read_text() + "alias ll='ls -l'\n")
+    capsys.readouterr()
+    dm.cmd_diff(MagicMock(entry_id=eid))
+    out = capsys.readouterr().out
+    assert "--- snapshot" in out and "+++ current" in out
+    assert "+alias ll='ls -l'" in out
+
+
+def test_do_link_creates_shared_parent_once(tmp_db, monkeypatch):
+    entries = []
+    for name in ("kitty", "nvim"):
+        src = tmp_db / f"{name}_source"
+        src.write_text(name)
+        entries.append(dm.DotfileEntry(0, name, str(src), str(tmp_db / ".config" / name),
+                                       "tool", "", True))
+    calls = []
+    real_makedirs = os.makedirs
+    monkeypatch.setattr(dm.os, "makedirs", lambda p, **kw: (calls.append(p), real_makedirs(p, **kw)))
+    parents_done = set()
+    for e in entries:
+        dm._do_link(e, parents_done)
+    assert calls == [str(tmp_db / ".config")]
+    assert all(Path(e.target_path).is_symlink() for e in entries)
+
+
+def test_register_many(tmp_db):
+    _register(tmp_db, "zshrc")
+    entries = [dm.DotfileEntry(0, name, f"/s/{name}", f"/t/{name}", "shell", "", auto)
+               for name, auto in (("zshrc", False), ("bashrc", True), ("profile", False))]
+    assert dm.register_many(entries) == 2
+    row = dm.get_db().execute("SELECT * FROM dotfiles WHERE name='bashrc'").fetchone()
+    assert row["auto_update"] == 1
+
+
+def test_register_no_resolve_keeps_source(tmp_db):
+    real = tmp_db / "real_tmux.conf"
+    real.write_text("set -g mouse on")
+    alias = tmp_db / "tmux.conf"
+    alias.symlink_to(real)
+    args = MagicMock(source=str(alias), target=str(tmp_db / ".tmux.conf"),
+                     category="tmux", description="", auto=False, resolve=False)
+    args.name = "tmux"
+    dm.cmd_register(args)
+    row = dm.get_db().execute("SELECT source_path FROM dotfiles WHERE name='tmux'").fetchone()
+    assert row["source_path"] == str(alias)
+
+
+def test_backup_all(tmp_db, capsys):
+    eid1, src1, _ = _register(tmp_db, "zshrc")
+    eid2, src2, _ = _register(tmp_db, "vimrc", category="editor")
+    _, src3, _ = _register(tmp_db, "tmux", category="tmux")
+    src3.unlink()
+    dm.cmd_backup(MagicMock(entry_id=eid1, notes=""))
+    dm.cmd_backup_all(MagicMock(notes="bulk"))
+    out = capsys.readouterr().out
+    assert "zshrc: unchanged" in out and "Saved 1 snapshot(s)" in out
+    db = dm.get_db()
+    snap = db.execute("SELECT * FROM snapshots WHERE entry_id=?", (eid2,)).fetchone()
+    assert snap["notes"] == "bulk"
+    assert snap["content_hash"] == dm.file_hash(str(src2))
+
+
+def test_failed_register_leaves_no_open_transaction(tmp_db, tmp_path):
+    src = tmp_db / "zshrc"
+    src.write_text("# zsh")
+    args = MagicMock(source=str(src), target=str(tmp_db / ".zshrc"), category="shell",
+                     description="", auto=False, resolve=True)
+    args.name = "zshrc"
+    dm.cmd_register(args)
+    dm.cmd_register(args)   # duplicate
+    assert not dm.get_db().in_transaction
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([{"name": "vimrc", "source_path": "/a", "target_path": "/b"}]))
+    dm.cmd_import_manifest(MagicMock(file=str(manifest)))
+    assert dm.register_many([dm.DotfileEntry(0, "tmux", "/c", "/d", "tmux", "", False)]) == 1
+
+
+def test_register_many_rejects_bad_category(tmp_db):
+    entries = [dm.DotfileEntry(0, "ok", "/a", "/b", "shell", "", False),
+               dm.DotfileEntry(0, "bad", "/c", "/d", "nope", "", False)]
+    with pytest.raises(ValueError, match="bad"):
+        dm.register_many(entries)
+    assert dm.get_db().execute("SELECT COUNT(*) FROM dotfiles").fetchone()[0] == 0
+
+
+def test_register_many_rolls_back_on_error(tmp_db):
+    with pytest.raises(sqlite3.Error):
+        dm.register_many([dm.DotfileEntry(0, "x", object(), "/b", "shell", "", False)])
+    assert not dm.get_db().in_transaction
+    assert dm.register_many([dm.DotfileEntry(0, "y", "/a", "/b", "shell", "", False)]) == 1
+
+
+def test_import_manifest_rolls_back_on_error(tmp_db, tmp_path, capsys):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([
+        {"name": "a", "source_path": "/a", "target_path": "/a"},
+        {"name": "b", "source_path": "/b", "target_path": "/b", "description": ["not", "bindable"]},
+    ]))
+    with pytest.raises(SystemExit) as exc:
+        dm.cmd_import_manifest(MagicMock(file=str(manifest)))
+    assert exc.value.code == 1
+    assert "Import failed, nothing imported" in capsys.readouterr().err
+    db = dm.get_db()
+    assert not db.in_transaction
+    assert db.execute("SELECT COUNT(*) FROM dotfiles").fetchone()[0] == 0
+
+
+def test_register_no_resolve_relative_source(tmp_db, monkeypatch):
+    (tmp_db / "zsh").write_text("# zsh")
+    monkeypatch.chdir(tmp_db)
+    target = tmp_db / "sub" / ".zshrel"
+    args = MagicMock(source="./zsh", target=str(target), category="shell",
+                     description="", auto=True, resolve=False)
+    args.name = "rel"
+    dm.cmd_register(args)
+    row = dm.get_db().execute("SELECT * FROM dotfiles WHERE name='rel'").fetchone()
+    assert row["source_path"] == str(tmp_db / "zsh")
+    dm.cmd_sync_all(MagicMock())
+    assert target.read_text() == "# zsh"
+
+
+def test_sync_all_reports_failures_and_continues(tmp_db, capsys):
+    _, _, dst_a = _register(tmp_db, "a", auto=True)
+    eid_b, _, _ = _register(tmp_db, "b", auto=True)
+    _, _, dst_c = _register(tmp_db, "c", auto=True)
+    (tmp_db / "plainfile").write_text("")
+    db = dm.get_db()
+    with db:
+        db.execute("UPDATE dotfiles SET target_path=? WHERE id=?",
+                   (str(tmp_db / "plainfile" / ".b"), eid_b))
+    dm.cmd_sync_all(MagicMock())
+    out = capsys.readouterr()
+    assert "a: linked" in out.out and "c: linked" in out.out
+    assert "  b: " in out.err
+    assert dst_a.is_symlink() and dst_c.is_symlink()
+
+
+def test_sync_all_shared_target_runs_in_turn(tmp_db, capsys):
+    _, src1, dst = _register(tmp_db, "one", auto=True)
+    eid2, src2, _ = _register(tmp_db, "two", auto=True)
+    db = dm.get_db()
+    with db:
+        db.execute("UPDATE dotfiles SET target_path=? WHERE id=?", (str(dst), eid2))
+    dm.cmd_sync_all(MagicMock())
+    out = capsys.readouterr()
+    assert out.err == ""
+    assert os.readlink(str(dst)) == str(src2)
+    assert os.readlink(str(dst) + ".bak") == str(src1)
+
+
+def test_backup_all_skips_reading_unchanged(tmp_db, monkeypatch):
+    eid, src, _ = _register(tmp_db, "zshrc")
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    reads = []
+    real = dm.read_and_hash
+    monkeypatch.setattr(dm, "read_and_hash", lambda p: (reads.append(p), real(p))[1])
+    dm.cmd_backup_all(MagicMock(notes=""))
+    assert reads == []
+    assert not dm.get_db().in_transaction
+
+
+def test_diff_shows_trailing_newline_change(tmp_db, capsys):
+    eid, src, dst = _register(tmp_db)
+    src.write_bytes(b"a\nb\n")
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    src.write_bytes(b"a\nb")
+    capsys.readouterr()
+    dm.cmd_diff(MagicMock(entry_id=eid))
+    out = capsys.readouterr().out
+    assert "-b\n+b\n\\ No newline at end of file\n" in out
+
+
+def test_diff_shows_crlf_change(tmp_db, capsys):
+    eid, src, dst = _register(tmp_db)
+    src.write_bytes(b"a\nb\n")
+    dm.cmd_backup(MagicMock(entry_id=eid, notes=""))
+    src.write_bytes(b"a\r\nb\r\n")
+    capsys.readouterr()
+    dm.cmd_diff(MagicMock(entry_id=eid))
+    assert "+a\r\n" in capsys.readouterr().out
+
+
+def test_import_manifest_skips_incomplete_items(tmp_db, tmp_path, capsys):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([
+        {"name": "a", "source_path": "/a", "target_path": "/a"},
+        {"source_path": "/b", "target_path": "/b"},
+    ]))
+    dm.cmd_import_manifest(MagicMock(file=str(manifest)))
+    assert "Imported 1/2 entries" in capsys.readouterr().out
+
+
+def test_db_connection_cached_per_thread(tmp_db):
+    import threading
+    main_db = dm.get_db()
+    result = {}
+    def worker():
+        result["db"] = dm.get_db()
+        result["count"] = dm.register_many([dm.DotfileEntry(0, "zshrc", "/a", "/b", "shell", "", False)])
+    t = threading.Thread(target=worker); t.start(); t.join()
+    assert result["count"] == 1
+    assert result["db"] is not main_db
+    assert main_db.execute("SELECT COUNT(*) FROM dotfiles").fetchone()[0] == 1